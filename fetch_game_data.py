@@ -1,14 +1,16 @@
 import os
-import json
-import requests
+import orjson
+import simdjson
+import aiohttp
 from pathlib import Path
+from urllib.parse import urlsplit
 import time
-import xml.etree.ElementTree as ET
-from bs4 import BeautifulSoup
+import io
+from lxml import etree
+from selectolax.lexbor import LexborHTMLParser
 import subprocess
 import re
 import asyncio
-from playwright.async_api import async_playwright
 import hashlib
 
 # --- Constants & environment --- #
@@ -31,6 +33,26 @@ appid_dir = Path("AppID")
 game_data_path = Path("game-data.json")
 top_owners_file = Path("top_owners.json")
 
+# Concurrency limits: AppIDs are processed in parallel, but each Steam host
+# is still throttled so a full run doesn't get us rate limited.
+MAX_CONCURRENT_APPIDS = 16
+MAX_CONNECTIONS_PER_HOST = 8
+REQUESTS_PER_SECOND_PER_HOST = 1.0
+REQUEST_BURST_PER_HOST = 3
+# Hosts with tighter limits than the default above
+HOST_REQUESTS_PER_SECOND = {
+    "store.steampowered.com": 0.6,  # appdetails allows ~200 requests per 5 minutes
+}
+MAX_PARALLEL_PROFILE_SCRAPES = 8  # per game, when looking for hidden descriptions
+
+APPID_PATH_RE = re.compile(rb"AppID/(\d+)/")
+# SteamHunters embeds its page data model as `var sh = {...};`
+SH_MODEL_RE = re.compile(rb"var\s+sh\s*=\s*(\{.*?\});", re.S)
+
+STEAMHUNTERS_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+}
+
 DEFAULT_OWNERS = [
     76561198028121353,
     76561198017975643,
@@ -69,101 +91,140 @@ DEFAULT_OWNERS = [
 # --- Helper functions --- #
 
 
-async def fetch_steamhunters_achievements(appid):
+class HostRateLimiter:
+    """Token bucket per host, shared by every concurrent fetch"""
+
+    def __init__(self, rate, burst, host_rates=None):
+        self.rate = rate
+        self.burst = burst
+        self.host_rates = host_rates or {}  # host -> requests per second
+        self.buckets = {}  # host -> (tokens, last refill time)
+        self.locks = {}
+
+    async def acquire(self, host):
+        rate = self.host_rates.get(host, self.rate)
+        lock = self.locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            tokens, last = self.buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * rate)
+            if tokens < 1:
+                await asyncio.sleep((1 - tokens) / rate)
+                now = time.monotonic()
+                tokens = 1
+            self.buckets[host] = (tokens - 1, now)
+
+
+rate_limiter = HostRateLimiter(
+    REQUESTS_PER_SECOND_PER_HOST, REQUEST_BURST_PER_HOST, HOST_REQUESTS_PER_SECOND
+)
+
+
+async def http_get(session, url, timeout=10, headers=None):
+    """GET a URL once the host's rate limit allows it, returns (status, body)"""
+    await rate_limiter.acquire(urlsplit(url).hostname)
+    async with session.get(
+        url, timeout=aiohttp.ClientTimeout(total=timeout), headers=headers
+    ) as response:
+        return response.status, await response.read()
+
+
+def json_pointer(doc, pointer):
+    """Resolve a JSON pointer in a simdjson document, [] if it doesn't exist"""
+    try:
+        return doc.at_pointer(pointer)
+    except KeyError:
+        return []
+
+
+async def fetch_steamhunters_achievements(session, appid):
     url = f"https://steamhunters.com/apps/{appid}/achievements?group=&sort=name"
-    print(f"    → Fetching groups from SteamHunters...")
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=True, args=["--disable-blink-features=AutomationControlled"]
-        )
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 800},
+    print(f"[{appid}]   → Fetching groups from SteamHunters...")
+    try:
+        status, body = await http_get(
+            session, url, timeout=15, headers=STEAMHUNTERS_HEADERS
         )
-        page = await context.new_page()
-        try:
-            await page.goto(url, timeout=15000)
-            await page.wait_for_function(
-                """() => Array.from(document.querySelectorAll('script')).some(s => s.textContent.includes('var sh'));"""
-            )
-            await page.evaluate(
-                """() => { const scripts = Array.from(document.querySelectorAll('script')); const target = scripts.find(s => s.textContent.includes('var sh')); eval(target.textContent); }"""
-            )
-            
-            # Fetch the entire data model
-            sh_model = await page.evaluate("""() => sh?.model || {}""")
-            
-            # 1. Build a lookup map for Update IDs -> Group Names
-            updates_map = {}
-            if "updates" in sh_model:
-                for update in sh_model["updates"]:
-                    u_id = update.get("updateId")
-                    
-                    # Robust Naming Logic:
-                    # 1. Official DLC Name
-                    if update.get("dlcAppName"):
-                        name = update.get("dlcAppName")
-                    # 2. Steam Event Name (e.g. "Summer Sale")
-                    elif update.get("steamEventName"):
-                        name = update.get("steamEventName")
-                    # 3. Base Game detection (Update #0 and no DLC ID)
-                    elif update.get("updateNumber", 0) == 0 and not update.get("dlcAppId"):
-                         name = "Base Game"
-                    # 4. Numbered Content Update (e.g. "Update 1.5")
-                    elif update.get("updateNumber", 0) > 0:
-                        name = f"Update {update.get('updateNumber')}"
-                    # 5. Fallback
-                    else:
-                        name = "Base Game" 
-                        
-                    updates_map[u_id] = name
-
-            # 2. Process the achievements items
-            achievements = sh_model.get("listData", {}).get("pagedList", {}).get("items", [])
-            
-            results = []
-            for item in achievements:
-                # Use the updateId to find the group name
-                update_id = item.get("updateId", 0)
-                group_name = updates_map.get(update_id, "Base Game")
-                
-                results.append({
-                    "name": item.get("apiName"),
-                    "default_value": 0,
-                    "displayName": item.get("name"),
-                    "hidden": 1 if item.get("hidden") else 0,
-                    "description": item.get("description") or " ",
-                    "icon": item.get("icon"),
-                    "icongray": item.get("iconGray"),
-                    "group": group_name 
-                })
-            return results
-        except Exception as e:
-            print(f"Error fetching from SteamHunters: {e}")
+        if status != 200:
+            print(f"[{appid}] Error fetching from SteamHunters: status {status}")
             return []
-        finally:
-            await browser.close()
+
+        match = SH_MODEL_RE.search(body)
+        if not match:
+            print(f"[{appid}] Error fetching from SteamHunters: data model not found in page")
+            return []
+        # Only a few fields of the model are used, so access it lazily
+        # instead of building Python objects for the whole thing
+        sh_model = simdjson.Parser().parse(match.group(1))
+
+        # 1. Build a lookup map for Update IDs -> Group Names
+        updates_map = {}
+        for update in json_pointer(sh_model, "/model/updates"):
+            u_id = update.get("updateId")
+
+            # Robust Naming Logic:
+            # 1. Official DLC Name
+            if update.get("dlcAppName"):
+                name = update.get("dlcAppName")
+            # 2. Steam Event Name (e.g. "Summer Sale")
+            elif update.get("steamEventName"):
+                name = update.get("steamEventName")
+            # 3. Base Game detection (Update #0 and no DLC ID)
+            elif update.get("updateNumber", 0) == 0 and not update.get("dlcAppId"):
+                name = "Base Game"
+            # 4. Numbered Content Update (e.g. "Update 1.5")
+            elif update.get("updateNumber", 0) > 0:
+                name = f"Update {update.get('updateNumber')}"
+            # 5. Fallback
+            else:
+                name = "Base Game"
+
+            updates_map[u_id] = name
+
+        # 2. Process the achievements items
+        achievements = json_pointer(sh_model, "/model/listData/pagedList/items")
+
+        results = []
+        for item in achievements:
+            # Use the updateId to find the group name
+            update_id = item.get("updateId", 0)
+            group_name = updates_map.get(update_id, "Base Game")
+
+            results.append({
+                "name": item.get("apiName"),
+                "default_value": 0,
+                "displayName": item.get("name"),
+                "hidden": 1 if item.get("hidden") else 0,
+                "description": item.get("description") or " ",
+                "icon": item.get("icon"),
+                "icongray": item.get("iconGray"),
+                "group": group_name
+            })
+        return results
+    except Exception as e:
+        print(f"[{appid}] Error fetching from SteamHunters: {e}")
+        return []
 
 
 def load_top_owner_ids():
     if top_owners_file.exists():
         try:
-            with open(top_owners_file, "r", encoding="utf-8") as f:
-                return json.load(f).get("steam_ids", DEFAULT_OWNERS)
+            return orjson.loads(top_owners_file.read_bytes()).get(
+                "steam_ids", DEFAULT_OWNERS
+            )
         except Exception as e:
             print(f"Error loading top_owners.json: {e}")
             return DEFAULT_OWNERS
     else:
         try:
-            with open(top_owners_file, "w", encoding="utf-8") as f:
-                json.dump(
+            top_owners_file.write_bytes(
+                orjson.dumps(
                     {
                         "steam_ids": DEFAULT_OWNERS,
                         "updated": "Created from hardcoded backup",
                     },
-                    f,
-                    indent=2,
+                    option=orjson.OPT_INDENT_2,
                 )
+            )
             print("✓ Created top_owners.json for future runs")
         except Exception as e:
             print(f"Warning: Could not create top_owners.json: {e}")
@@ -173,10 +234,20 @@ def load_top_owner_ids():
 TOP_OWNER_IDS = load_top_owner_ids()
 
 
+def git_output_lines(*args):
+    """Run a git command and return its stdout as a list of byte lines, None if it failed"""
+    result = subprocess.run(
+        ["git", *args], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    if result.returncode != 0:
+        return None
+    return result.stdout.splitlines()
+
+
 def get_changed_appids():
     """Get AppIDs that have changed in the triggering event"""
     try:
-        changed_files = []
+        changed_files = None
         
         # Check if we're in a push event by looking at GITHUB_SHA and GITHUB_BEFORE
         github_sha = os.environ.get("GITHUB_SHA", "")
@@ -185,49 +256,31 @@ def get_changed_appids():
         # If we have both SHA values, this is likely a push event
         if github_sha and github_before and github_before != "0000000000000000000000000000000000000000":
             print(f"Comparing push commits: {github_before[:7]}...{github_sha[:7]}")
-            result = subprocess.run(
-                ["git", "diff", "--name-only", github_before, github_sha],
-                capture_output=True,
-                text=True,
+            changed_files = git_output_lines(
+                "diff", "--name-only", github_before, github_sha, "--", "AppID/"
             )
-            if result.returncode == 0 and result.stdout.strip():
-                changed_files = result.stdout.strip().split("\n")
         
-        # If no push-specific changes found, try comparing HEAD~1 to HEAD
-        if not changed_files:
-            result = subprocess.run(
-                ["git", "diff", "--name-only", "HEAD~1", "HEAD"],
-                capture_output=True,
-                text=True,
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                changed_files = result.stdout.strip().split("\n")
+        # If this isn't a push or the push range couldn't be diffed, compare
+        # HEAD~1 to HEAD. A push that only touched other files is not a failure
+        if changed_files is None:
+            changed_files = git_output_lines(
+                "diff", "--name-only", "HEAD~1", "HEAD", "--", "AppID/"
+            ) or []
         
-        # Check for staged changes
-        result2 = subprocess.run(
-            ["git", "diff", "--name-only", "--cached"],
-            capture_output=True,
-            text=True,
-        )
-        if result2.returncode == 0 and result2.stdout.strip():
-            changed_files.extend(result2.stdout.strip().split("\n"))
-        
-        # Check for untracked files in AppID directory
-        result3 = subprocess.run(
-            ["git", "ls-files", "--others", "--exclude-standard", "AppID/"],
-            capture_output=True,
-            text=True,
-        )
-        if result3.returncode == 0 and result3.stdout.strip():
-            changed_files.extend(result3.stdout.strip().split("\n"))
+        # Staged, unstaged and untracked files in a single call
+        for line in git_output_lines(
+            "status", "--porcelain", "--untracked-files=all", "--", "AppID/"
+        ) or []:
+            # "XY path" or "XY orig -> path" for renames, unusual paths are quoted
+            changed_files.append(line[3:].split(b" -> ")[-1].strip(b'"'))
         
         # Extract AppIDs from changed files
         found_ids = set()
         for f in changed_files:
             # Match AppID/12345/... pattern
-            match = re.match(r"AppID/(\d+)/", f)
+            match = APPID_PATH_RE.match(f)
             if match:
-                found_ids.add(match.group(1))
+                found_ids.add(os.fsdecode(match.group(1)))
         
         if found_ids:
             print(f"Detected changes in AppIDs: {', '.join(sorted(found_ids))}")
@@ -243,8 +296,7 @@ def get_changed_appids():
 def load_json_file(file_path):
     if file_path.exists():
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return orjson.loads(file_path.read_bytes())
         except Exception as e:
             print(f"Error loading {file_path}: {e}")
     return None
@@ -252,12 +304,18 @@ def load_json_file(file_path):
 
 def save_json_file(file_path, data):
     try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        file_path.write_bytes(
+            orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        )
     except Exception as e:
         print(f"Error saving {file_path}: {e}")
 
 
+def content_hash(data):
+    """Short digest used to tell whether upstream data changed since the last run"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
 def get_text(elem):
     return elem.text if elem is not None and elem.text else ""
 
@@ -288,194 +346,227 @@ def load_achievements_file(folder):
     return None, None
 
 
-def scrape_hidden_achievements(appid, steam_id, achievement_names_map):
+def parse_profile_html(html, achievement_names_map):
+    """Match the achievement rows of a profile's stats page to API names"""
+    achievements = {}
+    for row in LexborHTMLParser(html).css("div.achieveRow"):
+        name_elem = row.css_first("h3")
+        desc_elem = row.css_first("h5")
+        if not name_elem or not desc_elem:
+            continue
+        display_name = name_elem.text().strip()
+        description = desc_elem.text().strip()
+        api_name = achievement_names_map.get(display_name.lower())
+        if api_name and description:
+            achievements[api_name] = {
+                "name": display_name,
+                "description": description,
+            }
+    return achievements
+
+
+async def scrape_hidden_achievements(session, sem, appid, steam_id, achievement_names_map):
     try:
         url = (
             f"https://steamcommunity.com/profiles/{steam_id}/stats/{appid}/achievements"
         )
-        print(f"    → Trying profile {steam_id}...")
-        response = requests.get(url, timeout=15)
-        if response.status_code != 200:
-            print(f"    ✗ Profile returned status {response.status_code}")
+        async with sem:
+            print(f"[{appid}]   → Trying profile {steam_id}...")
+            status, body = await http_get(session, url, timeout=15)
+        if status != 200:
+            print(f"[{appid}]   ✗ Profile returned status {status}")
             return {}
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        achievements = {}
-        for row in soup.find_all("div", class_="achieveRow"):
-            name_elem = row.find("h3")
-            desc_elem = row.find("h5")
-            if not name_elem or not desc_elem:
-                continue
-            display_name = name_elem.text.strip()
-            description = desc_elem.text.strip()
-            api_name = achievement_names_map.get(display_name.lower())
-            if api_name and description:
-                achievements[api_name] = {
-                    "name": display_name,
-                    "description": description,
-                }
-
+        # Parsing is CPU work, keep it off the event loop
+        achievements = await asyncio.to_thread(
+            parse_profile_html, body, achievement_names_map
+        )
         if achievements:
-            print(f"    ✓ Matched {len(achievements)} achievement API names")
+            print(f"[{appid}]   ✓ Matched {len(achievements)} achievement API names")
         return achievements
     except Exception as e:
-        print(f"    ✗ Error: {e}")
+        print(f"[{appid}]   ✗ Error: {e}")
         return {}
 
 
-def fetch_steam_store_info(appid):
+async def fetch_steam_store_info(session, appid):
+    """Returns the store name and header image, None if the store didn't answer"""
     try:
-        response = requests.get(
-            f"https://store.steampowered.com/api/appdetails?appids={appid}", timeout=10
+        status, body = await http_get(
+            session, f"https://store.steampowered.com/api/appdetails?appids={appid}"
         )
-        if response.ok:
-            data = response.json().get(appid, {})
+        if status == 200:
+            data = orjson.loads(body).get(appid, {})
             if data.get("success"):
                 return {
                     "name": data["data"].get("name", f"Game {appid}"),
                     "icon": data["data"].get("header_image", ""),
                 }
+        else:
+            print(f"[{appid}] Error fetching store info: status {status}")
     except Exception as e:
-        print(f"Error fetching store info for {appid}: {e}")
-    return {"name": f"Game {appid}", "icon": ""}
+        print(f"[{appid}] Error fetching store info: {e}")
+    return None
 
 
-def fetch_community_achievements(appid):
+def parse_community_xml(xml):
+    """Read the achievements out of a community stats XML document"""
     achievements = {}
+    # Stream the achievements instead of building the whole tree
+    for _, ach in etree.iterparse(io.BytesIO(xml), tag="achievement"):
+        api_name_elem = ach.find("apiname")
+        if api_name_elem is not None and api_name_elem.text:
+            api_name = api_name_elem.text
+            achievements[api_name] = {
+                "name": get_text(ach.find("name")),
+                "description": get_text(ach.find("description")),
+                "icon": get_text(ach.find("iconOpen")),
+                "icongray": get_text(ach.find("iconClosed")),
+                "hidden": False,
+            }
+        # Drop what's already been read to keep memory flat
+        ach.clear()
+        while ach.getprevious() is not None:
+            del ach.getparent()[0]
+    return achievements
+
+
+async def fetch_community_achievements(session, appid):
+    """Returns the XML achievements and a hash of the raw XML (None on failure)"""
+    achievements = {}
+    xml_hash = None
     try:
-        response = requests.get(
-            f"https://steamcommunity.com/stats/{appid}/achievements/?xml=1", timeout=10
+        status, body = await http_get(
+            session, f"https://steamcommunity.com/stats/{appid}/achievements/?xml=1"
         )
-        if response.ok:
-            root = ET.fromstring(response.content)
-            for ach in root.findall(".//achievement"):
-                api_name_elem = ach.find("apiname")
-                if api_name_elem is not None and api_name_elem.text:
-                    api_name = api_name_elem.text
-                    achievements[api_name] = {
-                        "name": get_text(ach.find("name")),
-                        "description": get_text(ach.find("description")),
-                        "icon": get_text(ach.find("iconOpen")),
-                        "icongray": get_text(ach.find("iconClosed")),
-                        "hidden": False,
-                    }
-    except ET.ParseError as e:
-        print(f"  ✗ XML parse error for {appid}: {e}")
+        if status == 200:
+            # Parsing is CPU work, keep it off the event loop
+            achievements = await asyncio.to_thread(parse_community_xml, body)
+            xml_hash = content_hash(body)
+    except etree.XMLSyntaxError as e:
+        print(f"[{appid}] ✗ XML parse error: {e}")
     except Exception as e:
-        print(f"Error fetching community achievements for {appid}: {e}")
-    return achievements
+        print(f"[{appid}] Error fetching community achievements: {e}")
+    return achievements, xml_hash
+
+
+async def fetch_global_percentages(session, appid):
+    """Returns the global unlock percentages for a game, None if unavailable"""
+    try:
+        status, body = await http_get(
+            session,
+            f"https://api.steampowered.com/ISteamUserStats/GetGlobalAchievementPercentagesForApp/v0002/?gameid={appid}",
+        )
+        if status == 200:
+            return (
+                orjson.loads(body)
+                .get("achievementpercentages", {})
+                .get("achievements", [])
+            )
+    except Exception as e:
+        print(f"[{appid}] Error fetching global percentages: {e}")
+    return None
+
+
+async def fetch_schema_achievements(session, appid):
+    """Returns the API schema achievements and a hash of the response, (None, None) if unavailable"""
+    if not STEAM_API_KEY:
+        return None, None
+    try:
+        status, body = await http_get(
+            session,
+            f"https://api.steampowered.com/ISteamUserStats/GetSchemaForGame/v2/?key={STEAM_API_KEY}&appid={appid}",
+        )
+        if status == 200:
+            achievements = (
+                orjson.loads(body)
+                .get("game", {})
+                .get("availableGameStats", {})
+                .get("achievements", [])
+            )
+            return achievements, content_hash(body)
+    except Exception as e:
+        print(f"[{appid}] Error fetching schema: {e}")
+    return None, None
 
 
-def fetch_achievements(appid, existing_info, achievements_from_xml):
+def merge_achievements(appid, existing_info, achievements_from_xml, sh_data, schema_achievements):
     hidden_achievements = []
     achievement_names_map = {}
     achievements_info = {}
 
-    # ALWAYS fetch from SteamHunters to get Group Data (if possible)
+    # SteamHunters data is ALWAYS fetched to get Group Data (if possible)
     # Even if we have an API key, the API key doesn't give us Groups/DLCs
-    steamhunters_data = {}
-    try:
-        print("  → Fetching extra data (groups) from SteamHunters...")
-        sh_data = asyncio.run(fetch_steamhunters_achievements(appid))
-        for item in sh_data:
-            steamhunters_data[item["name"]] = item
-    except Exception as e:
-        print(f"  ⚠ Could not fetch SteamHunters data: {e}")
+    steamhunters_data = {item["name"]: item for item in sh_data}
 
     try:
-        # 1. Prefer Steam API if Key exists
-        if STEAM_API_KEY:
-            response = requests.get(
-                f"https://api.steampowered.com/ISteamUserStats/GetSchemaForGame/v2/?key={STEAM_API_KEY}&appid={appid}",
-                timeout=10,
-            )
-            if response.ok:
-                achievements = (
-                    response.json()
-                    .get("game", {})
-                    .get("availableGameStats", {})
-                    .get("achievements", [])
-                )
-            else:
-                # Fallback to SH data if API fails
-                achievements = sh_data if 'sh_data' in locals() else []
-        else:
-            # No API Key -> Use SteamHunters data
-            achievements = sh_data if 'sh_data' in locals() else []
+        # 1. Prefer Steam API if Key exists, fall back to SH data if there
+        # is no key or the API failed
+        achievements = schema_achievements if schema_achievements is not None else sh_data
         
         # Fix icons for ALL achievements (both from API and SteamHunters)
+        icon_prefix = f"https://cdn.steamstatic.com/steamcommunity/public/images/apps/{appid}/"
         try:
             for ach in achievements:
                 # Safely handle icon
                 if ach.get("icon"):
                     if not ach["icon"].startswith("http"):
-                        ach["icon"] = f'https://cdn.steamstatic.com/steamcommunity/public/images/apps/{appid}/{ach["icon"]}.jpg'
+                        ach["icon"] = icon_prefix + ach["icon"] + ".jpg"
                 else:
                     ach["icon"] = FALLBACK_ICON_URL
         
                 # Safely handle icongray
                 if ach.get("icongray"):
                     if not ach["icongray"].startswith("http"):
-                        ach["icongray"] = f'https://cdn.steamstatic.com/steamcommunity/public/images/apps/{appid}/{ach["icongray"]}.jpg'
+                        ach["icongray"] = icon_prefix + ach["icongray"] + ".jpg"
                 else:
                     ach["icongray"] = FALLBACK_ICON_URL
         except Exception as e:
-            print(f"  ⚠ Error fixing icon URLs: {e}")
-
-        for ach in achievements:
-            api_name = ach["name"]
-            is_hidden = ach.get("hidden", 0) == 1
-            display_name = ach.get("displayName", ach["name"])
-            achievement_names_map[display_name.lower()] = api_name
-
-            # Base info
-            achievements_info[api_name] = {
-                "name": display_name,
-                "description": ach.get("description", ""),
+            print(f"[{appid}] ⚠ Error fixing icon URLs: {e}")
+
+        # Base info merged with XML descriptions (often better), SteamHunters
+        # groups and the description from the existing file, in one pass
+        old_achievements = existing_info.get("achievements", {})
+        achievements_info = {
+            ach["name"]: {
+                "name": ach.get("displayName", ach["name"]),
+                "description": ach.get("description")
+                or achievements_from_xml.get(ach["name"], {}).get("description")
+                or old_achievements.get(ach["name"], {}).get("description", ""),
                 "icon": ach.get("icon", ""),
                 "icongray": ach.get("icongray", ""),
-                "hidden": is_hidden,
+                "hidden": ach.get("hidden", 0) == 1,
+                "group": steamhunters_data.get(ach["name"], {}).get("group", "Base Game"),
             }
-
-            # Merge XML data if exists (often better descriptions)
-            if api_name in achievements_from_xml:
-                # Keep XML description if API has none
-                if not achievements_info[api_name]["description"]:
-                    achievements_info[api_name]["description"] = achievements_from_xml[api_name]["description"]
-                
-                # Keep hidden status from API/SH though
-                achievements_info[api_name]["hidden"] = is_hidden
-
-            # MERGE GROUP DATA FROM STEAMHUNTERS
-            if api_name in steamhunters_data:
-                achievements_info[api_name]["group"] = steamhunters_data[api_name].get("group", "Base Game")
-            else:
-                achievements_info[api_name]["group"] = "Base Game"
-
-            # Fallback for description from existing file
-            if not achievements_info[api_name]["description"]:
-                old_desc = (
-                    existing_info.get("achievements", {})
-                    .get(api_name, {})
-                    .get("description", "")
-                )
-                if old_desc:
-                    achievements_info[api_name]["description"] = old_desc
-            
-            if is_hidden and not achievements_info[api_name]["description"]:
-                hidden_achievements.append(api_name)
+            for ach in achievements
+        }
+        achievement_names_map = {
+            info["name"].lower(): api_name for api_name, info in achievements_info.items()
+        }
+        hidden_achievements = [
+            api_name
+            for api_name, info in achievements_info.items()
+            if info["hidden"] and not info["description"]
+        ]
 
     except Exception as e:
-        print(f"  ✗ Error fetching schema achievements for {appid}: {e}")
+        print(f"[{appid}] ✗ Error merging achievement data: {e}")
 
     return achievements_info, hidden_achievements, achievement_names_map
 
 
 # --- Determine AppIDs to process --- #
 
+# Scanned once and reused by the final assembly, DirEntry already knows the
+# entry type so this doesn't stat every folder
+with os.scandir(appid_dir) as entries:
+    appid_folders = [
+        Path(entry.path) for entry in entries if entry.is_dir() and entry.name.isdigit()
+    ]
+
 # FIXED: Process all games ONLY for scheduled runs or explicit manual trigger
 if EVENT_NAME == "schedule" or (EVENT_NAME == "workflow_dispatch" and TRIGGER_SOURCE == "manual"):
-    appids = [f.name for f in appid_dir.iterdir() if f.is_dir() and f.name.isdigit()]
+    appids = [folder.name for folder in appid_folders]
     print(f"Processing all {len(appids)} games (Reason: {EVENT_NAME} trigger with source: {TRIGGER_SOURCE or 'scheduled'})")
 
 # Process changed games only for push events or workflow calls triggered by push
@@ -487,216 +578,245 @@ else:
         print("No game-specific changes detected. Exiting.")
         exit(0)
 
-# --- Load existing game-data.json --- #
-existing_game_data = {}
-existing_data_file = load_json_file(game_data_path)
-
-if existing_data_file:
-    if isinstance(existing_data_file, dict) and "games" in existing_data_file:
-        existing_data_list = existing_data_file["games"]
-    else:
-        existing_data_list = existing_data_file
-    
-    for game in existing_data_list:
-        existing_game_data[game["appid"]] = game
-    print(f"Loaded existing data for {len(existing_game_data)} games")
-
 # --- Main AppID Processing Loop --- #
-for appid in appids:
-    print(f"\nProcessing AppID {appid}...")
-    base_path = appid_dir / appid
-
-    platform_files = list(base_path.glob("*.platform"))
-    current_platform = platform_files[0].stem if platform_files else None
-
-    blacklist_file = base_path / "blacklist"
-    current_blacklist = (
-        [
-            line.strip()
-            for line in open(blacklist_file, "r", encoding="utf-8")
-            if line.strip()
-        ]
-        if blacklist_file.exists()
-        else []
-    )
+async def process_appid(session, sem, appid):
+    async with sem:
+        print(f"\n[{appid}] Processing AppID {appid}...")
+        base_path = appid_dir / appid
+
+        platform_files = list(base_path.glob("*.platform"))
+        current_platform = platform_files[0].stem if platform_files else None
+
+        blacklist_file = base_path / "blacklist"
+        current_blacklist = (
+            [
+                line.strip()
+                for line in blacklist_file.read_text(encoding="utf-8").splitlines()
+                if line.strip()
+            ]
+            if blacklist_file.exists()
+            else []
+        )
 
-    skip_file = base_path / "skip"
-    if skip_file.exists():
-        print(f"  ! 'skip' file found, skipping data fetch for {appid}")
-        existing_info = load_json_file(base_path / "game-info.json")
-        achievements_data, file_type = load_achievements_file(base_path)
+        skip_file = base_path / "skip"
+        if skip_file.exists():
+            print(f"[{appid}] ! 'skip' file found, skipping data fetch")
+            existing_info = load_json_file(base_path / "game-info.json")
         
-        if existing_info and achievements_data:
-            existing_info["platform"] = current_platform
-            existing_info["blacklist"] = current_blacklist
-            
-            existing_game_data[str(appid)] = {
-                "appid": str(appid),
-                "info": existing_info,
-                "achievements": achievements_data,
+            if existing_info:
+                existing_info["platform"] = current_platform
+                existing_info["blacklist"] = current_blacklist
+                await asyncio.to_thread(
+                    save_json_file, base_path / "game-info.json", existing_info
+                )
+                print(f"[{appid}] ✓ Existing data preserved with platform: {current_platform}")
+            else:
+                print(f"[{appid}] ✗ Could not load existing info for skipped game")
+            return
+    
+        existing_info = load_json_file(base_path / "game-info.json") or {}
+
+        game_info = {
+            "appid": appid,
+            "name": f"Game {appid}",
+            "icon": "",
+            "achievements": {},
+            "platform": current_platform,
+            "blacklist": current_blacklist,
+            "uses_db": (base_path / f"{appid}.db").exists()
+        }
+
+        # --- Fetch data --- #
+        # Percentages don't depend on anything else, so start them first and
+        # only wait for them when they get merged in
+        percent_task = asyncio.create_task(fetch_global_percentages(session, appid))
+        (
+            store_info,
+            (achievements_from_xml, xml_hash),
+            sh_data,
+            (schema_achievements, schema_hash),
+        ) = await asyncio.gather(
+            fetch_steam_store_info(session, appid),
+            fetch_community_achievements(session, appid),
+            fetch_steamhunters_achievements(session, appid),
+            fetch_schema_achievements(session, appid),
+        )
+        if store_info is None:
+            # Keep the last known name and header image instead of placeholders
+            store_info = {
+                "name": existing_info.get("name", game_info["name"]),
+                "icon": existing_info.get("icon", game_info["icon"]),
             }
-            print(f"  ✓ Existing data preserved with platform: {current_platform}")
+        game_info.update(store_info)
+        game_info["platform"] = current_platform
+        print(f"[{appid}] ✓ Got {len(achievements_from_xml)} achievements from XML")
+
+        # sh_data only holds the fields we use (names, hidden flag, descriptions,
+        # icons, group), not the volatile stats on the page, so hash all of it
+        sh_hash = content_hash(orjson.dumps(sh_data))
+        upstream_unchanged = (
+            xml_hash is not None
+            and xml_hash == existing_info.get("xml_hash")
+            and sh_hash == existing_info.get("sh_hash")
+            and schema_hash == existing_info.get("schema_hash")
+            and game_info["name"] == existing_info.get("name")
+            and existing_info.get("achievements")
+            and not (base_path / "missing hidden achievements").exists()
+        )
+        game_info["xml_hash"] = xml_hash
+        game_info["sh_hash"] = sh_hash
+        game_info["schema_hash"] = schema_hash
+
+        if upstream_unchanged:
+            # Nothing to merge or scrape, only the percentages get refreshed
+            print(f"[{appid}] ✓ Upstream data unchanged, reusing existing achievements")
+            achievements = existing_info["achievements"]
+            hidden_achievements = []
         else:
-            print(f"  ✗ Could not load existing info/achievements for skipped game {appid}")
-        continue
-    
-    existing_info = load_json_file(base_path / "game-info.json") or {}
-
-    game_info = {
-        "appid": appid,
-        "name": f"Game {appid}",
-        "icon": "",
-        "achievements": {},
-        "platform": current_platform,
-        "blacklist": current_blacklist,
-        "uses_db": (base_path / f"{appid}.db").exists()
-    }
-
-    # --- Fetch data --- #
-    store_info = fetch_steam_store_info(appid)
-    game_info.update(store_info)
-    game_info["platform"] = current_platform
-    time.sleep(1.5)
-
-    achievements_from_xml = fetch_community_achievements(appid)
-    print(f"  ✓ Got {len(achievements_from_xml)} achievements from XML")
-    time.sleep(1.5)
-
-    achievements, hidden_achievements, achievement_names_map = fetch_achievements(
-        appid, existing_info, achievements_from_xml
-    )
+            achievements, hidden_achievements, achievement_names_map = merge_achievements(
+                appid, existing_info, achievements_from_xml, sh_data, schema_achievements
+            )
     
-    # Skip games with 0 achievements (similar to skip file behavior)
-    if len(achievements) == 0:
-        print(f"  ! Steam returned 0 achievements, skipping data fetch for {appid}")
-        existing_info = load_json_file(base_path / "game-info.json")
-        achievements_data, file_type = load_achievements_file(base_path)
+        # Skip games with 0 achievements (similar to skip file behavior)
+        if len(achievements) == 0:
+            print(f"[{appid}] ! Steam returned 0 achievements, skipping data fetch")
+            existing_info = load_json_file(base_path / "game-info.json")
         
-        if existing_info and achievements_data:
-            existing_info["platform"] = current_platform
-            existing_info["blacklist"] = current_blacklist
-            
-            existing_game_data[str(appid)] = {
-                "appid": str(appid),
-                "info": existing_info,
-                "achievements": achievements_data,
-            }
-            print(f"  ✓ Existing data preserved with platform: {current_platform}")
-        else:
-            print(f"  ✗ Could not load existing info/achievements for game {appid} with 0 achievements")
-        continue
+            if existing_info:
+                existing_info["platform"] = current_platform
+                existing_info["blacklist"] = current_blacklist
+                await asyncio.to_thread(
+                    save_json_file, base_path / "game-info.json", existing_info
+                )
+                print(f"[{appid}] ✓ Existing data preserved with platform: {current_platform}")
+            else:
+                print(f"[{appid}] ✗ Could not load existing info for game with 0 achievements")
+            percent_task.cancel()
+            return
     
-    game_info["achievements"].update(achievements)
-    print(f"  ✓ Merged {len(achievements)} achievements")
+        game_info["achievements"].update(achievements)
+        print(f"[{appid}] ✓ Merged {len(achievements)} achievements")
 
-    if hidden_achievements:
-        print(
-            f"  → Found {len(hidden_achievements)} hidden achievements without descriptions"
-        )
-        descriptions_found = 0
-        for steam_id in TOP_OWNER_IDS[:32]:
-            scraped = scrape_hidden_achievements(appid, steam_id, achievement_names_map)
-            for api_name, data in scraped.items():
-                if (
-                    api_name in game_info["achievements"]
-                    and not game_info["achievements"][api_name]["description"]
-                ):
-                    game_info["achievements"][api_name]["description"] = data[
-                        "description"
-                    ]
-                    descriptions_found += 1
-                    print(f"    ✓ Found: '{data['name']}'")
-
-            missing = sum(
-                1
-                for api in hidden_achievements
-                if not game_info["achievements"][api]["description"]
+        if hidden_achievements:
+            print(
+                f"[{appid}] → Found {len(hidden_achievements)} hidden achievements without descriptions"
+            )
+            descriptions_found = 0
+            profile_sem = asyncio.Semaphore(MAX_PARALLEL_PROFILE_SCRAPES)
+            scrape_tasks = [
+                asyncio.create_task(
+                    scrape_hidden_achievements(
+                        session, profile_sem, appid, steam_id, achievement_names_map
+                    )
+                )
+                for steam_id in TOP_OWNER_IDS[:32]
+            ]
+            try:
+                # Merge profiles as they finish, stop as soon as nothing is missing
+                for next_scraped in asyncio.as_completed(scrape_tasks):
+                    scraped = await next_scraped
+                    for api_name, data in scraped.items():
+                        if (
+                            api_name in game_info["achievements"]
+                            and not game_info["achievements"][api_name]["description"]
+                        ):
+                            game_info["achievements"][api_name]["description"] = data[
+                                "description"
+                            ]
+                            descriptions_found += 1
+                            print(f"[{appid}]   ✓ Found: '{data['name']}'")
+
+                    missing = sum(
+                        1
+                        for api in hidden_achievements
+                        if not game_info["achievements"][api]["description"]
+                    )
+                    print(
+                        f"[{appid}]   → Progress: {descriptions_found}/{len(hidden_achievements)} found, {missing} missing"
+                    )
+                    if missing == 0:
+                        break
+            finally:
+                for task in scrape_tasks:
+                    task.cancel()
+                await asyncio.gather(*scrape_tasks, return_exceptions=True)
+
+        percentages = await percent_task
+
+        if percentages is not None:
+            for ach_percent in percentages:
+                ach_name = ach_percent.get("name")
+                if ach_name in game_info["achievements"]:
+                    game_info["achievements"][ach_name]["percent"] = (ach_percent.get("percent", 0))
+
+            print(f"[{appid}] ✓ Got percentages")
+
+        missing_file_path = base_path / "missing hidden achievements"
+        still_missing_api_names = [
+            api
+            for api in hidden_achievements
+            if not game_info["achievements"][api]["description"]
+        ]
+        if still_missing_api_names:
+            missing_file_path.write_text(
+                "\n".join(still_missing_api_names) + "\n", encoding="utf-8"
             )
             print(
-                f"    → Progress: {descriptions_found}/{len(hidden_achievements)} found, {missing} missing"
+                f"[{appid}] ⚠ Created/Updated 'missing hidden achievements' file ({len(still_missing_api_names)} items)"
+            )
+        elif missing_file_path.exists():
+            missing_file_path.unlink()
+            print(
+                f"[{appid}] ✓ All hidden descriptions found, removed 'missing hidden achievements' file"
             )
-            if missing == 0:
-                break
-            time.sleep(2)
-
-    percent_url = f"https://api.steampowered.com/ISteamUserStats/GetGlobalAchievementPercentagesForApp/v0002/?gameid={appid}"
-    percent_response = requests.get(percent_url, timeout=10)
-
-    if percent_response.ok:
-        percent_data = percent_response.json()
-        percentages = percent_data.get("achievementpercentages", {}).get("achievements", [])
-
-        for ach_percent in percentages:
-            ach_name = ach_percent.get("name")
-            if ach_name in game_info["achievements"]:
-                game_info["achievements"][ach_name]["percent"] = (ach_percent.get("percent", 0))
-
-        print(f"  ✓ Got percentages")
-
-    missing_file_path = base_path / "missing hidden achievements"
-    still_missing_api_names = [
-        api
-        for api in hidden_achievements
-        if not game_info["achievements"][api]["description"]
-    ]
-    if still_missing_api_names:
-        with open(missing_file_path, "w", encoding="utf-8") as f:
-            f.writelines(f"{api}\n" for api in still_missing_api_names)
-        print(
-            f"  ⚠ Created/Updated 'missing hidden achievements' file ({len(still_missing_api_names)} items)"
-        )
-    elif missing_file_path.exists():
-        missing_file_path.unlink()
-        print(
-            "  ✓ All hidden descriptions found, removed 'missing hidden achievements' file"
-        )
 
-    save_json_file(base_path / "game-info.json", game_info)
-
-    achievements_data, file_type = load_achievements_file(base_path)
-    if achievements_data is None:
-        print(f"  ✗ No achievements file found for {appid}")
-        continue
-    print(f"  ✓ Loaded achievements from {file_type} format")
-
-    existing_game_data[str(appid)] = {
-        "appid": str(appid),
-        "info": game_info,
-        "achievements": achievements_data,
-    }
-
-# --- Rebuild complete game-data.json --- #
-all_game_data = []
-for folder in appid_dir.iterdir():
-    if folder.is_dir() and folder.name.isdigit():
-        current_appid = folder.name
-        achievements_data, _ = load_achievements_file(folder)
-        
-        if achievements_data is None:
-            print(f"  ⚠ Skipping {current_appid} - no achievements file found")
-            continue
-        if current_appid in existing_game_data:
-            all_game_data.append(existing_game_data[current_appid])
-        else:
+        await asyncio.to_thread(save_json_file, base_path / "game-info.json", game_info)
+
+
+async def process_all(appids):
+    sem = asyncio.Semaphore(MAX_CONCURRENT_APPIDS)
+    connector = aiohttp.TCPConnector(limit_per_host=MAX_CONNECTIONS_PER_HOST)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(process_appid(session, sem, appid) for appid in appids))
+
+
+asyncio.run(process_all(appids))
+
+# --- Write game-data.json from the per-AppID files --- #
+# Every game was saved to its game-info.json above, so each one is read back,
+# encoded and written in turn and only one of them is held in memory.
+# last_updated has to stay at the very start, the frontend only range-requests
+# the first bytes of the file to check it
+total_games = 0
+tmp_game_data_path = game_data_path.with_name(game_data_path.name + ".tmp")
+try:
+    with open(tmp_game_data_path, "wb") as f:
+        f.write(b'{"last_updated":%d,"games":[' % int(time.time()))
+        for folder in appid_folders:
+            current_appid = folder.name
+            achievements_data, _ = load_achievements_file(folder)
+            if achievements_data is None:
+                print(f"  ⚠ Skipping {current_appid} - no achievements file found")
+                continue
             info_data = load_json_file(folder / "game-info.json") or {
                 "appid": current_appid,
                 "name": f"Game {current_appid}",
                 "icon": "",
                 "achievements": {},
             }
-            all_game_data.append(
-                {
-                    "appid": current_appid,
-                    "info": info_data,
-                    "achievements": achievements_data,
-                }
-            )
-
-final_output = {
-    "last_updated": int(time.time()),
-    "total_games": len(all_game_data),
-    "games": all_game_data
-}
-
-save_json_file(game_data_path, final_output)
-print(f"\n✓ Updated {len(appids)} game(s), total games in data: {len(all_game_data)}")
+            game_entry = {
+                "appid": current_appid,
+                "info": info_data,
+                "achievements": achievements_data,
+            }
+            if total_games:
+                f.write(b",")
+            f.write(orjson.dumps(game_entry, option=orjson.OPT_NON_STR_KEYS))
+            total_games += 1
+        f.write(b'],"total_games":%d}' % total_games)
+    os.replace(tmp_game_data_path, game_data_path)
+except Exception as e:
+    print(f"Error saving {game_data_path}: {e}")
+    # Don't leave a partial file in the work tree for the commit step to pick up
+    tmp_game_data_path.unlink(missing_ok=True)
+print(f"\n✓ Updated {len(appids)} game(s), total games in data: {total_games}")
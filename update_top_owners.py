@@ -1,36 +1,53 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from selectolax.lexbor import LexborHTMLParser
 import re
-import json
+import orjson
 from pathlib import Path
 
+PROFILE_RE = re.compile(r"/profile/(\d{17})")
+
+SESSION = requests.Session()
+SESSION.headers["User-Agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.5),
+    ),
+)
+
 print("Updating TOP_OWNER_IDS from steamladder.com...")
 
 try:
     URL = "https://steamladder.com/ladder/games/"
-    response = requests.get(URL, timeout=15)
+    response = SESSION.get(URL, timeout=15)
     response.raise_for_status()
 
-    soup = BeautifulSoup(response.text, "html.parser")
+    tree = LexborHTMLParser(response.text)
 
     steam_ids = []
-    for a in soup.select('a[href^="/profile/"]'):
-        m = re.search(r"/profile/(\d{17})", a.get("href", ""))
+    seen = set()
+    for a in tree.css('a[href^="/profile/"]'):
+        m = PROFILE_RE.search(a.attributes.get("href") or "")
         if m:
             steam_id = int(m.group(1))
-            if steam_id not in steam_ids:
+            if steam_id not in seen:
+                seen.add(steam_id)
                 steam_ids.append(steam_id)
 
     steam_ids = steam_ids[:32]  # Top 32 users
 
     if len(steam_ids) >= 10:
         # Write to top_owners.json
-        with open("top_owners.json", "w", encoding="utf-8") as f:
-            json.dump(
+        Path("top_owners.json").write_bytes(
+            orjson.dumps(
                 {"steam_ids": steam_ids, "updated": "Auto-updated by GitHub Actions"},
-                f,
-                indent=2,
+                option=orjson.OPT_INDENT_2,
             )
+        )
 
         print(f"✓ Updated top_owners.json with {len(steam_ids)} Steam IDs")
     else: